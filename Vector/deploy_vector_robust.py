@@ -1,7 +1,11 @@
 import argparse
+import concurrent.futures
 import os
 import sys
-from google.cloud import aiplatform
+import time
+
+# How often to report progress while the index deployment LRO is running.
+DEPLOY_POLL_INTERVAL_SECONDS = 180
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Robust Vector Search Deployment")
@@ -33,10 +37,66 @@ def parse_args():
     parser.add_argument("--min_replicas", type=int, default=1, help="Min replica count")
     parser.add_argument("--max_replicas", type=int, default=1, help="Max replica count")
 
+    # --- Operations ---
+    parser.add_argument("--operation_timeout_seconds", type=int, default=3 * 3600,
+                        help="Timeout for the create/deploy requests (default: 10800)")
+
     return parser.parse_args()
 
+def create_index(args, index_name):
+    """Creates the Matching Engine Index (blocks until the LRO finishes)."""
+    from google.cloud import aiplatform
+
+    if args.index_type == "tree-ah":
+        return aiplatform.MatchingEngineIndex.create_tree_ah_index(
+            display_name=index_name,
+            contents_delta_uri=args.gcs_uri,
+            dimensions=args.dimensions,
+            approximate_neighbors_count=args.approx_neighbors,
+            distance_measure_type=args.distance_measure,
+            shard_size=args.shard_size,
+            index_update_method=args.update_method,
+            description="Deployed via Robust Python Automation",
+            create_request_timeout=args.operation_timeout_seconds
+        )
+    # Brute Force
+    return aiplatform.MatchingEngineIndex.create_brute_force_index(
+        display_name=index_name,
+        contents_delta_uri=args.gcs_uri,
+        dimensions=args.dimensions,
+        distance_measure_type=args.distance_measure,
+        shard_size=args.shard_size,
+        index_update_method=args.update_method,
+        description="Deployed via Robust Python Automation",
+        create_request_timeout=args.operation_timeout_seconds
+    )
+
+def create_endpoint(args, endpoint_name):
+    """Creates the Index Endpoint (blocks until the LRO finishes)."""
+    from google.cloud import aiplatform
+
+    # Parse Boolean for PSC
+    psc_enabled = args.enable_psc.lower() == "true"
+
+    # If PSC is enabled, public_endpoint MUST be False
+    # If PSC is disabled, public_endpoint MUST be True (usually)
+    public_ip = not psc_enabled
+
+    allowlist = args.allowlist_projects.split(",") if args.allowlist_projects else []
+
+    return aiplatform.MatchingEngineIndexEndpoint.create(
+        display_name=endpoint_name,
+        public_endpoint_enabled=public_ip,
+        project_allowlist=allowlist if psc_enabled else None,
+        description="Robust Endpoint",
+        create_request_timeout=args.operation_timeout_seconds
+    )
+
 def main():
     args = parse_args()
+
+    # Imported here so --help and argument errors don't pay for loading the SDK.
+    from google.cloud import aiplatform
     
     # Initialize Vertex AI SDK
     aiplatform.init(project=args.project_id, location=args.region)
@@ -47,73 +107,56 @@ def main():
     
     print(f"🚀 Starting robust deployment for {args.display_name}...")
 
-    # ==============================================================================
-    # 1. CREATE INDEX (Robust Logic)
-    # ==============================================================================
-    existing_indexes = aiplatform.MatchingEngineIndex.list(filter=f'display_name="{index_name}"')
-    
-    if existing_indexes:
-        my_index = existing_indexes[0]
-        print(f"✅ Found existing Index: {my_index.resource_name}")
-    else:
-        print(f"🛠 Creating new {args.index_type} Index...")
-        
-        if args.index_type == "tree-ah":
-            my_index = aiplatform.MatchingEngineIndex.create_tree_ah_index(
-                display_name=index_name,
-                contents_delta_uri=args.gcs_uri,
-                dimensions=args.dimensions,
-                approximate_neighbors_count=args.approx_neighbors,
-                distance_measure_type=args.distance_measure,
-                shard_size=args.shard_size,
-                index_update_method=args.update_method,
-                description="Deployed via Robust Python Automation"
-            )
-        else: # Brute Force
-            my_index = aiplatform.MatchingEngineIndex.create_brute_force_index(
-                display_name=index_name,
-                contents_delta_uri=args.gcs_uri,
-                dimensions=args.dimensions,
-                distance_measure_type=args.distance_measure,
-                shard_size=args.shard_size,
-                index_update_method=args.update_method,
-                description="Deployed via Robust Python Automation"
-            )
-        print(f"✅ Index Created: {my_index.resource_name}")
-
-    # ==============================================================================
-    # 2. CREATE ENDPOINT (Private Service Connect Logic)
-    # ==============================================================================
-    existing_endpoints = aiplatform.MatchingEngineIndexEndpoint.list(filter=f'display_name="{endpoint_name}"')
-    
-    if existing_endpoints:
-        my_endpoint = existing_endpoints[0]
-        print(f"✅ Found existing Endpoint: {my_endpoint.resource_name}")
-    else:
-        print("🛠 Creating new Endpoint...")
-        
-        # Parse Boolean for PSC
-        psc_enabled = args.enable_psc.lower() == "true"
-        
-        # If PSC is enabled, public_endpoint MUST be False
-        # If PSC is disabled, public_endpoint MUST be True (usually)
-        public_ip = not psc_enabled
-        
-        allowlist = args.allowlist_projects.split(",") if args.allowlist_projects else []
-        
-        my_endpoint = aiplatform.MatchingEngineIndexEndpoint.create(
-            display_name=endpoint_name,
-            public_endpoint_enabled=public_ip,
-            project_allowlist=allowlist if psc_enabled else None,
-            description="Robust Endpoint"
+    # Index and Endpoint lookups/creations are independent of each other,
+    # so run them side by side instead of one after the other.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        indexes_future = executor.submit(
+            aiplatform.MatchingEngineIndex.list, filter=f'display_name="{index_name}"'
         )
-        print(f"✅ Endpoint Created: {my_endpoint.resource_name}")
+        endpoints_future = executor.submit(
+            aiplatform.MatchingEngineIndexEndpoint.list, filter=f'display_name="{endpoint_name}"'
+        )
+        existing_indexes = indexes_future.result()
+        existing_endpoints = endpoints_future.result()
+
+        # ==============================================================================
+        # 1. CREATE INDEX (Robust Logic)
+        # ==============================================================================
+        index_future = None
+        if existing_indexes:
+            my_index = existing_indexes[0]
+            print(f"✅ Found existing Index: {my_index.resource_name}")
+        else:
+            print(f"🛠 Creating new {args.index_type} Index...")
+            index_future = executor.submit(create_index, args, index_name)
+
+        # ==============================================================================
+        # 2. CREATE ENDPOINT (Private Service Connect Logic)
+        # ==============================================================================
+        endpoint_future = None
+        if existing_endpoints:
+            my_endpoint = existing_endpoints[0]
+            print(f"✅ Found existing Endpoint: {my_endpoint.resource_name}")
+        else:
+            print("🛠 Creating new Endpoint...")
+            endpoint_future = executor.submit(create_endpoint, args, endpoint_name)
+
+        if index_future:
+            my_index = index_future.result()
+            print(f"✅ Index Created: {my_index.resource_name}")
+        if endpoint_future:
+            my_endpoint = endpoint_future.result()
+            print(f"✅ Endpoint Created: {my_endpoint.resource_name}")
 
     # ==============================================================================
     # 3. DEPLOY INDEX TO ENDPOINT
     # ==============================================================================
-    # Check if this specific index is already on this endpoint
-    is_deployed = any(d.id == deployed_id for d in my_endpoint.deployed_indexes)
+    # Check if this specific index is already on this endpoint. A freshly
+    # created endpoint has nothing deployed, so skip the extra endpoint fetch.
+    if existing_endpoints:
+        is_deployed = any(d.id == deployed_id for d in my_endpoint.deployed_indexes)
+    else:
+        is_deployed = False
     
     if is_deployed:
         print("✅ Index is already deployed.")
@@ -126,8 +169,17 @@ def main():
             deployed_index_id=deployed_id,
             machine_type=args.machine_type,
             min_replica_count=args.min_replicas,
-            max_replica_count=args.max_replicas
+            max_replica_count=args.max_replicas,
+            deploy_request_timeout=args.operation_timeout_seconds,
+            sync=False
         )
+        # Poll the LRO ourselves instead of blocking inside the SDK call.
+        started = time.monotonic()
+        while not my_endpoint._are_futures_done():
+            time.sleep(DEPLOY_POLL_INTERVAL_SECONDS)
+            print(f"   ...still deploying ({int(time.monotonic() - started) // 60} min elapsed)")
+        # Re-raises any error from the background deployment.
+        my_endpoint.wait()
         print("✅ Deployment Complete.")
 
     # ==============================================================================
@@ -140,11 +192,19 @@ def main():
         print(f"Target Project:    {args.project_id}")
         print(f"Region:            {args.region}")
         print(f"Endpoint ID:       {my_endpoint.resource_name}")
-        
-        # Try to extract Service Attachment if available in SDK properties
-        # (Note: Some SDK versions require an extra 'describe' call or checking logs)
-        print("Please check the GitHub Actions logs or GCP Console for the 'Service Attachment' URI")
-        print("and create the PSC Forwarding Rule in the Shared VPC.")
+
+        # With PSC, the Service Attachment is reported on the deployed index
+        deployed_index = next((d for d in my_endpoint.deployed_indexes if d.id == deployed_id), None)
+        service_attachment = deployed_index.private_endpoints.service_attachment if deployed_index else ""
+        if service_attachment:
+            print(f"Service Attachment: {service_attachment}")
+            # Expose it to later workflow steps (e.g. the PSC forwarding rule job)
+            if 'GITHUB_OUTPUT' in os.environ:
+                with open(os.environ['GITHUB_OUTPUT'], 'a') as f:
+                    print(f"service_attachment={service_attachment}", file=f)
+        else:
+            print("Service Attachment not reported yet; check the GCP Console for the URI.")
+        print("Create the PSC Forwarding Rule in the Shared VPC.")
         print("="*60)
 
 if __name__ == "__main__":
@@ -1,78 +1,125 @@
 # scripts/remove_owner_role.py
 
 import argparse
-import json
-import subprocess
 import sys
-import os
 
-def run_gcloud_command(command_args, expect_json=True):
-    """Runs a gcloud command and returns the output."""
-    try:
-        if expect_json:
-            command_args.append("--format=json")
-        process = subprocess.run(
-            ["gcloud"] + command_args,
-            capture_output=True, text=True, check=False
-        )
-        if process.returncode != 0:
-            print(f"Error: gcloud command failed: {' '.join(['gcloud'] + command_args)}", file=sys.stderr)
-            print(f"Stderr:\n{process.stderr}", file=sys.stderr)
-            sys.exit(process.returncode)
-        if expect_json and not process.stdout.strip():
-             return {}
-        return json.loads(process.stdout) if expect_json else process.stdout.strip()
-    except Exception as e:
-        print(f"An unexpected Python error occurred: {e}", file=sys.stderr)
-        sys.exit(1)
+# How many times to re-read and re-apply the policy when another writer
+# changes it between our get and set (etag mismatch).
+MAX_POLICY_WRITE_ATTEMPTS = 3
+
+def remove_members(project_id, members, roles=("roles/owner",), client=None):
+    """
+    Removes every member in `members` from every role in `roles` in the
+    project's IAM policy in a single read-modify-write of the policy. If the
+    write hits an etag conflict, the whole cycle is retried, up to
+    MAX_POLICY_WRITE_ATTEMPTS times.
+
+    Args:
+        project_id (str): The GCP Project ID.
+        members (iterable): IAM members, e.g. 'serviceAccount:sa@project.iam.gserviceaccount.com'.
+        roles (iterable, optional): Roles to remove the members from. Defaults to ('roles/owner',).
+        client (resourcemanager_v3.ProjectsClient, optional): Client to reuse across calls.
+
+    Returns:
+        bool: True if the policy was updated, False if no change was needed.
+        Errors from the Resource Manager API are raised to the caller.
+    """
+    from google.api_core import exceptions
+
+    if client is None:
+        from google.cloud import resourcemanager_v3
+        client = resourcemanager_v3.ProjectsClient()
+    project_name = client.project_path(project_id)
+    members = set(members)
+    roles = sorted(set(roles))
+
+    for attempt in range(1, MAX_POLICY_WRITE_ATTEMPTS + 1):
+        print("[1/3] Fetching current IAM policy...")
+        policy = client.get_iam_policy(resource=project_name)
+
+        if not policy.etag:
+            raise RuntimeError("Could not retrieve etag from policy. Cannot proceed safely.")
+
+        print(f"[2/3] Checking policy for {', '.join(roles)} role(s)...")
+        # Index bindings by role once (first binding wins, as with the old scan)
+        by_role = {}
+        for b in policy.bindings:
+            by_role.setdefault(b.role, b)
+
+        policy_modified = False
+        for role in roles:
+            binding = by_role.get(role)
+
+            # Split the binding's members in a single pass
+            kept, removed = [], []
+            for m in (binding.members if binding else ()):
+                (removed if m in members else kept).append(m)
+
+            if not removed:
+                print(f"   Member(s) {', '.join(sorted(members))} do not have the '{role}' role. No changes needed.")
+                continue
+
+            policy_modified = True
+            for m in removed:
+                print(f"   Found '{m}' in the '{role}' binding. Removing it now.")
+            if kept:
+                del binding.members[:]
+                binding.members.extend(kept)
+            else:
+                policy.bindings.remove(binding)
+                print(f"   The '{role}' binding is now empty and will be removed from the policy.")
+
+        if not policy_modified:
+            return False
+
+        print("\n[3/3] Applying modified IAM policy...")
+        try:
+            # The policy still carries the etag from the fetch above, so a
+            # concurrent change is rejected (ABORTED) instead of overwritten.
+            client.set_iam_policy(request={"resource": project_name, "policy": policy})
+            return True
+        except exceptions.Aborted:
+            if attempt == MAX_POLICY_WRITE_ATTEMPTS:
+                raise
+            print(f"   IAM policy was changed concurrently (etag mismatch). Retrying ({attempt}/{MAX_POLICY_WRITE_ATTEMPTS})...")
+
+def remove_member_role(project_id, member, role, client=None):
+    """
+    Removes a single `member` from the `role` binding. See remove_members().
+    """
+    return remove_members(project_id, [member], [role], client=client)
 
 def main():
     parser = argparse.ArgumentParser(description="Safely removes the 'owner' role from a service account on a GCP project.")
     parser.add_argument("--project-id", required=True, help="The GCP Project ID.")
-    parser.add_argument("--service-account-email", required=True, help="Email of the GCP Service Account.")
+    parser.add_argument("--service-account-email", required=True, action="append",
+                        help="Email of the GCP Service Account. Repeat to remove several accounts in one policy update.")
     args = parser.parse_args()
 
+    # Ensure the required Google Cloud library is installed.
+    try:
+        from google.cloud import resourcemanager_v3
+    except ImportError:
+        print("Error: The 'google-cloud-resourcemanager' library is not installed.", file=sys.stderr)
+        print("Please install it: pip install google-cloud-resourcemanager", file=sys.stderr)
+        sys.exit(1)
+
     project_id = args.project_id.strip() # Add strip() for extra safety
-    member_to_remove = f"serviceAccount:{args.service_account_email}"
-    role_to_remove = "roles/owner"
+    members_to_remove = [f"serviceAccount:{email}" for email in args.service_account_email]
 
     print(f"-> Starting secure IAM operations for project: '{project_id}'")
-    
-    print(f"[1/3] Fetching current IAM policy...")
-    policy = run_gcloud_command(["projects", "get-iam-policy", project_id])
-    
-    original_etag = policy.get("etag")
-    if not original_etag:
-        print("Error: Could not retrieve etag from policy. Cannot proceed safely.", file=sys.stderr)
+    try:
+        policy_modified = remove_members(
+            project_id, members_to_remove, client=resourcemanager_v3.ProjectsClient()
+        )
+    except Exception as e:
+        print(f"Error updating IAM policy: {e}", file=sys.stderr)
         sys.exit(1)
 
-    print("[2/3] Checking policy for owner role...")
-    policy_modified = False
-    owner_binding = next((b for b in policy.get("bindings", []) if b.get("role") == role_to_remove), None)
-
-    if owner_binding and member_to_remove in owner_binding.get("members", []):
-        print(f"   Found '{member_to_remove}' in the '{role_to_remove}' binding. Removing it now.")
-        owner_binding["members"].remove(member_to_remove)
-        policy_modified = True
-        if not owner_binding["members"]:
-            policy["bindings"].remove(owner_binding)
-            print("   Binding is now empty and will be removed from the policy.")
-    else:
-        print(f"   Member '{member_to_remove}' does not have the '{role_to_remove}' role. No changes needed.")
-
     if policy_modified:
-        print("\n[3/3] Applying modified IAM policy...")
-        temp_policy_file = "policy_to_apply.json"
-        with open(temp_policy_file, "w") as f:
-            json.dump(policy, f)
-        try:
-            run_gcloud_command(["projects", "set-iam-policy", project_id, temp_policy_file], expect_json=False)
-            print("✅ Success: IAM policy updated and owner role removed.")
-        finally:
-            if os.path.exists(temp_policy_file):
-                os.remove(temp_policy_file)
+        print("✅ Success: IAM policy updated and owner role removed.")
     else:
         print("\n✅ No IAM changes were necessary. Workflow complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
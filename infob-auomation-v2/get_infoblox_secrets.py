@@ -1,6 +1,25 @@
+import asyncio
+import functools
 import os
 from google.cloud import secretmanager
 
+@functools.lru_cache(maxsize=1)
+def _client():
+    """
+    Returns a Secret Manager client shared by the whole process, so the
+    gRPC channel and credential discovery are only set up once.
+    """
+    return secretmanager.SecretManagerServiceClient()
+
+@functools.lru_cache(maxsize=32)
+def _access_secret_payload(secret_version_name):
+    """
+    Fetches and decodes a secret version's payload. Successful results are
+    memoized; errors are not, so a failed lookup is retried on the next call.
+    """
+    response = _client().access_secret_version(request={"name": secret_version_name})
+    return response.payload.data.decode("UTF-8")
+
 def get_infoblox_secrets(project_id, secret_name):
     """
     Retrieves Infoblox API credentials from Google Cloud Secret Manager.
@@ -12,17 +31,51 @@ def get_infoblox_secrets(project_id, secret_name):
     Returns:
         dict: A dictionary containing the Infoblox API credentials, or None on error.
     """
-    client = secretmanager.SecretManagerServiceClient()
     secret_version_name = f"projects/{project_id}/secrets/{secret_name}/versions/latest"
 
     try:
-        response = client.access_secret_version(request={"name": secret_version_name})
-        payload = response.payload.data.decode("UTF-8")
-        return payload
+        return _access_secret_payload(secret_version_name)
     except Exception as e:
         print(f"Error accessing secret: {e}")
         return None
 
+def access_secrets(project_id, secret_ids):
+    """
+    Retrieves several secrets over the shared Secret Manager client.
+
+    Args:
+        project_id (str): The ID of the Google Cloud project.
+        secret_ids (list): The names of the secrets to fetch.
+
+    Returns:
+        dict: Maps each secret name to its decoded payload. Errors are raised.
+    """
+    return {
+        secret_id: _access_secret_payload(f"projects/{project_id}/secrets/{secret_id}/versions/latest")
+        for secret_id in secret_ids
+    }
+
+async def get_infoblox_secrets_async(project_id, secret_names):
+    """
+    Retrieves several secrets from Google Cloud Secret Manager concurrently.
+
+    Args:
+        project_id (str): The ID of the Google Cloud project.
+        secret_names (list): The names of the secrets to fetch.
+
+    Returns:
+        dict: Maps each secret name to its decoded payload. Errors are raised.
+    """
+    # The async client is bound to the running event loop, so it is created here
+    client = secretmanager.SecretManagerServiceAsyncClient()
+    responses = await asyncio.gather(*[
+        client.access_secret_version(
+            request={"name": f"projects/{project_id}/secrets/{name}/versions/latest"}
+        )
+        for name in secret_names
+    ])
+    return {name: r.payload.data.decode("UTF-8") for name, r in zip(secret_names, responses)}
+
 if __name__ == "__main__":
     # Example usage:
     project_id = os.environ.get("GCP_PROJECT_ID")
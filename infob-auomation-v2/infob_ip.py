@@ -3,31 +3,64 @@ import json
 import ipaddress
 import sys
 import os
+import time
+import threading
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Network views and supernets change on the order of months, so their lookups
+# are cached for the life of the process. Supernet entries also carry the
+# utilization, so they expire and are dropped whenever the supernet changes.
+SUPERNET_CACHE_TTL_SECONDS = 600
+_NETWORK_VIEW_REF_CACHE = {}  # (api_url, network_view_name) -> ref
+_SUPERNET_CACHE = {}  # (network_view_ref, supernet_cidr) -> ((ref, utilization), expires_at)
+
+DEFAULT_CREDS_FILE = "infoblox_creds.json"
+_CREDS_CACHE = {}  # creds file path -> (credentials, session, mtime)
+_CREDS_CACHE_LOCK = threading.Lock()
+
+class WapiSession(requests.Session):
+    """
+    A requests.Session that resolves relative WAPI paths (e.g. "/wapi/v2.11/network")
+    against the Infoblox base URL, so every helper can share one pooled session.
+    """
+    def __init__(self, api_url):
+        super().__init__()
+        self.api_url = api_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith('/'):
+            url = f"{self.api_url}{url}"
+        return super().request(method, url, *args, **kwargs)
 
 def get_infoblox_data(api_url, username, password, verify_ssl=True):
     """
-    Establishes a session with the Infoblox API and retrieves common data.
+    Creates a session for the Infoblox API. No request is made here; connection
+    and authentication errors surface on the first real WAPI call.
 
     Args:
         api_url (str): The base URL of the Infoblox API.
         username (str): The Infoblox API username.
         password (str): The Infoblox API password.
-        verify_ssl (bool, optional): Whether to verify SSL certificates. Defaults to True.
+        verify_ssl (bool or str, optional): Whether to verify SSL certificates, or
+            the path of a CA bundle to verify against. Defaults to True.
 
     Returns:
-        requests.Session: A session object connected to the Infoblox API, or None on error.
+        WapiSession: A session object for the Infoblox API.
     """
-    session = requests.Session()
+    session = WapiSession(api_url)
     session.auth = (username, password)
     session.verify = verify_ssl
     session.headers.update({'Content-Type': 'application/json'})
-    try:
-        response = session.get(f"{api_url}/wapi/v2.11", timeout=10)  # Use a specific WAPI version
-        response.raise_for_status()
-        return session
-    except requests.exceptions.RequestException as e:
-        print(f"Error connecting to Infoblox API: {e}")
-        return None
+    # Keep-alive pool shared by every WAPI call made through this session.
+    # Retries only apply to reads: a replayed nextavailablenetwork POST could
+    # reserve twice, and a replayed DELETE that already succeeded would 404.
+    session.mount("https://", HTTPAdapter(
+        pool_maxsize=10,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504],
+                          allowed_methods=frozenset({"GET", "HEAD"})),
+    ))
+    return session
 
 def get_network_view_ref(session, network_view_name):
     """
@@ -40,11 +73,20 @@ def get_network_view_ref(session, network_view_name):
     Returns:
         str: The object reference of the Network View, or None if not found.
     """
+    cache_key = (getattr(session, "api_url", None), network_view_name)
+    if cache_key in _NETWORK_VIEW_REF_CACHE:
+        return _NETWORK_VIEW_REF_CACHE[cache_key]
     try:
-        response = session.get(f"/wapi/v2.11/networkview?name={network_view_name}", timeout=10)
+        response = session.get(
+            "/wapi/v2.11/networkview",
+            # An empty _return_fields returns only the _ref
+            params={"name": network_view_name, "_return_fields": ""},
+            timeout=10,
+        )
         response.raise_for_status()
         data = response.json()
         if data:
+            _NETWORK_VIEW_REF_CACHE[cache_key] = data[0]['_ref']
             return data[0]['_ref']
         else:
             print(f"Network View '{network_view_name}' not found.")
@@ -53,96 +95,78 @@ def get_network_view_ref(session, network_view_name):
         print(f"Error retrieving Network View: {e}")
         return None
 
-def get_supernet_utilization(session, supernet_ref):
+def get_supernet(session, network_view_ref, supernet_cidr):
     """
-    Calculates the utilization of a supernet.
-
-    Args:
-        session (requests.Session): The Infoblox API session.
-        supernet_ref (str): The object reference of the supernet.
-
-    Returns:
-        float: The utilization percentage (0-100), or None on error.
-    """
-    try:
-        response = session.get(f"/wapi/v2.11/{supernet_ref}?_fields=utilization", timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if 'utilization' in data:
-            return data['utilization']
-        else:
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error retrieving supernet utilization: {e}")
-        return None
-
-def find_available_cidr(session, network_view_ref, supernet_cidr, prefix_length):
-    """
-    Finds an available CIDR within a supernet in Infoblox.
+    Retrieves a supernet's object reference and utilization in a single request.
 
     Args:
         session (requests.Session): The Infoblox API session.
         network_view_ref (str): The object reference of the Network View.
         supernet_cidr (str): The CIDR of the supernet.
-        prefix_length (int): The desired prefix length of the subnet.
 
     Returns:
-        str: The available CIDR, or None if no CIDR is available.
+        tuple: (supernet_ref, utilization) where utilization may be None,
+               or (None, None) if the supernet was not found or on error.
     """
-    payload = {
-        "network_view": network_view_ref,
-        "supernet": supernet_cidr,
-        "prefix": prefix_length,
-    }
+    cache_key = (network_view_ref, supernet_cidr)
+    cached = _SUPERNET_CACHE.get(cache_key)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
     try:
-        response = session.post("/wapi/v2.11/network/available", json=payload, timeout=10)
+        response = session.get(
+            "/wapi/v2.11/network",
+            params={"network": supernet_cidr, "network_view": network_view_ref, "_return_fields": "utilization"},
+            timeout=10,
+        )
         response.raise_for_status()
         data = response.json()
-        if data and 'cidr' in data:
-            return data['cidr']
+        if data:
+            result = (data[0]['_ref'], data[0].get('utilization'))
+            _SUPERNET_CACHE[cache_key] = (result, time.monotonic() + SUPERNET_CACHE_TTL_SECONDS)
+            return result
         else:
-            print(f"No available CIDR found in {supernet_cidr} with prefix length {prefix_length}")
-            return None
+            print(f"Supernet '{supernet_cidr}' not found.")
+            return None, None
     except requests.exceptions.RequestException as e:
-        print(f"Error finding available CIDR: {e}")
-        return None
+        print(f"Error retrieving supernet: {e}")
+        return None, None
 
-def reserve_cidr(session, network_view_ref, supernet_cidr, cidr, subnet_name):
+def reserve_next_available_cidr(session, network_view_ref, supernet_ref, prefix_length, subnet_name):
     """
-    Reserves a CIDR in Infoblox.
+    Finds and reserves the next available CIDR in a supernet with one request.
 
     Args:
         session (requests.Session): The Infoblox API session.
         network_view_ref (str): The object reference of the Network View.
-        supernet_cidr (str): The CIDR of the supernet.
-        cidr (str): The CIDR to reserve.
+        supernet_ref (str): The object reference of the supernet.
+        prefix_length (int): The desired prefix length of the subnet.
         subnet_name (str): The name/comment for the subnet.
 
     Returns:
-        str: The object reference of the reserved network, or None on error.
+        tuple: (cidr, ref) of the reserved network, or (None, None) on error.
     """
-
-    network_address = str(ipaddress.ip_network(cidr, strict=False).network_address)
-    prefix_length = ipaddress.ip_network(cidr, strict=False).prefixlen
+    # Whether this succeeds (utilization changes) or fails (the ref may be
+    # stale), the cached supernet entry is no longer trustworthy.
+    for key, ((ref, _), _) in list(_SUPERNET_CACHE.items()):
+        if ref == supernet_ref:
+            del _SUPERNET_CACHE[key]
     payload = {
+        "network": f"func:nextavailablenetwork:{supernet_ref},{prefix_length}",
         "network_view": network_view_ref,
-        "network": network_address,
-        "prefixlen": prefix_length,
         "comment": subnet_name,
     }
-
     try:
-        response = session.post("/wapi/v2.11/network", json=payload, timeout=10)
+        response = session.post("/wapi/v2.11/network", params={"_return_fields": "network"}, json=payload, timeout=10)
         response.raise_for_status()
         data = response.json()
-        if '_ref' in data:
-            return data['_ref']
+        if '_ref' in data and 'network' in data:
+            return data['network'], data['_ref']
         else:
-            print(f"Failed to reserve CIDR {cidr} in Infoblox.")
-            return None
+            print(f"No available CIDR found in supernet with prefix length {prefix_length}")
+            return None, None
     except requests.exceptions.RequestException as e:
-        print(f"Error reserving CIDR: {e}")
-        return None
+        print(f"Error reserving next available CIDR: {e}")
+        return None, None
 
 def delete_cidr(session, network_view_ref, cidr, subnet_name):
     """
@@ -159,22 +183,32 @@ def delete_cidr(session, network_view_ref, cidr, subnet_name):
     """
     try:
         # Find the network object by network address, prefix length, network view, and comment.
-        network_address = str(ipaddress.ip_network(cidr, strict=False).network_address)
-        prefix_length = ipaddress.ip_network(cidr, strict=False).prefixlen
+        net = ipaddress.ip_network(cidr, strict=False)
+        network_address = str(net.network_address)
+        prefix_length = net.prefixlen
         response = session.get(
-            f"/wapi/v2.11/network?network={network_address}&prefixlen={prefix_length}&network_view={network_view_ref}&comment={subnet_name}", timeout=10
+            "/wapi/v2.11/network",
+            params={
+                "network": network_address,
+                "prefixlen": prefix_length,
+                "network_view": network_view_ref,
+                "comment": subnet_name,
+                # Only the first match's _ref is needed. A positive
+                # _max_results truncates; a negative one errors on extra matches.
+                "_return_fields": "",
+                "_max_results": 1,
+            },
+            timeout=10,
         )
         response.raise_for_status()
         data = response.json()
 
         if data:
-            # Loop through the results and delete anyone
-            for network_object in data:
-                network_ref = network_object['_ref']
-                delete_response = session.delete(f"/wapi/v2.11/{network_ref}", timeout=10)
-                delete_response.raise_for_status()
-                print(f"Deleted CIDR {cidr} with subnet name '{subnet_name}' from Infoblox.")
-                return True
+            network_ref = data[0]['_ref']
+            delete_response = session.delete(f"/wapi/v2.11/{network_ref}", timeout=10)
+            delete_response.raise_for_status()
+            print(f"Deleted CIDR {cidr} with subnet name '{subnet_name}' from Infoblox.")
+            return True
         else:
             print(f"CIDR {cidr} with subnet name '{subnet_name}' not found in Infoblox.")
             return False
@@ -186,6 +220,117 @@ def delete_cidr(session, network_view_ref, cidr, subnet_name):
         print(f"Error: {e}")
         return False
 
+def _parse_verify_ssl(value):
+    """
+    Maps the creds file's IB_VERIFY_SSL to a requests `verify` value: explicit
+    false strings ("false", "0", "no") disable verification, true strings
+    ("true", "1", "yes") enable it, and any other string is passed through
+    as a CA bundle path.
+    """
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip()
+    if text.lower() in ("false", "0", "no"):
+        return False
+    if text.lower() in ("true", "1", "yes"):
+        return True
+    return text
+
+def load_credentials(creds_file=DEFAULT_CREDS_FILE):
+    """
+    Loads the Infoblox credentials file and opens a session for it, reusing both
+    while the file is unchanged so a process that drives several operations
+    only parses the file and sets up the session once.
+
+    Args:
+        creds_file (str, optional): Path to the credentials JSON file.
+
+    Returns:
+        tuple: (credentials dict, session).
+
+    Raises:
+        FileNotFoundError, json.JSONDecodeError, KeyError: If the file is missing,
+        invalid, or lacks a required key.
+    """
+    with _CREDS_CACHE_LOCK:
+        mtime = os.stat(creds_file).st_mtime
+        cached = _CREDS_CACHE.get(creds_file)
+        if cached and cached[2] == mtime:
+            return cached[0], cached[1]
+
+        with open(creds_file, "r") as f:
+            credentials = json.load(f)
+        api_url = credentials["IB_API_URL"]
+        username = credentials["IB_API_USERNAME"]
+        password = credentials["IB_API_PASSWORD"]
+        verify_ssl = _parse_verify_ssl(credentials.get("IB_VERIFY_SSL", True))
+
+        if cached:
+            cached[1].close()
+        session = get_infoblox_data(api_url, username, password, verify_ssl)
+        _CREDS_CACHE[creds_file] = (credentials, session, mtime)
+        return credentials, session
+
+def _reserve(session, network_view_name, supernet_cidr, cidr_prefix, subnet_name):
+    """
+    Reserves the next available CIDR of `cidr_prefix` in a supernet.
+
+    Returns:
+        tuple: (cidr, ref, supernet_utilization), or None on error.
+    """
+    network_view_ref = get_network_view_ref(session, network_view_name)
+    if network_view_ref is None:
+        return None
+
+    supernet_ref, supernet_utilization = get_supernet(session, network_view_ref, supernet_cidr)
+    if supernet_ref is None:
+        return None
+
+    available_cidr, ref = reserve_next_available_cidr(
+        session, network_view_ref, supernet_ref, cidr_prefix, subnet_name
+    )
+    if available_cidr is None:
+        return None
+    return available_cidr, ref, supernet_utilization
+
+def _delete(session, network_view_name, cidr, subnet_name):
+    """
+    Deletes the CIDR reservation with the given subnet name.
+
+    Returns:
+        bool: True if the CIDR was deleted successfully, False otherwise.
+    """
+    network_view_ref = get_network_view_ref(session, network_view_name)
+    if network_view_ref is None:
+        return False
+    return delete_cidr(session, network_view_ref, cidr, subnet_name)
+
+def run(operation, creds_file=DEFAULT_CREDS_FILE, **kwargs):
+    """
+    Library entry point: performs `operation` ('reserve' or 'delete') with the
+    keyword arguments of _reserve() or _delete(), reusing the cached
+    credentials and session for `creds_file`.
+    """
+    _, session = load_credentials(creds_file)
+    if operation == "reserve":
+        return _reserve(session, **kwargs)
+    if operation == "delete":
+        return _delete(session, **kwargs)
+    raise ValueError(f"Unknown operation '{operation}'. Must be 'reserve' or 'delete'.")
+
+def write_outputs(outputs):
+    """
+    Writes each output to its own file for consumption by later GitHub Actions
+    steps (reserve_cidr.yml reads them individually). None values are skipped.
+
+    Args:
+        outputs (dict): Mapping of file name to value.
+    """
+    for filename, value in outputs.items():
+        if value is not None:
+            with open(filename, "w") as f:
+                f.write(str(value))
+
 def main():
     """
     Main function to parse arguments and perform IPAM operations.
@@ -201,12 +346,7 @@ def main():
 
     # Load credentials from infoblox_creds.json
     try:
-        with open("infoblox_creds.json", "r") as f:
-            credentials = json.load(f)
-            api_url = credentials["IB_API_URL"]
-            username = credentials["IB_API_USERNAME"]
-            password = credentials["IB_API_PASSWORD"]
-            verify_ssl = credentials.get("IB_VERIFY_SSL", True)  # Default to True if not present
+        _, session = load_credentials(DEFAULT_CREDS_FILE)
     except FileNotFoundError:
         print("Error: infoblox_creds.json file not found.  Make sure this file exists in the directory where you run the script.")
         sys.exit(1)
@@ -217,10 +357,6 @@ def main():
         print(f"Error: Missing key in infoblox_creds.json: {e}")
         sys.exit(1)
 
-    session = get_infoblox_data(api_url, username, password, verify_ssl)
-    if session is None:
-        sys.exit(1)
-
     if operation == "reserve":
         if len(sys.argv) != 6:
             print("Usage: python infoblox_ipam.py reserve <network_view> <supernet_cidr> <cidr_prefix> <subnet_name>")
@@ -230,51 +366,25 @@ def main():
         cidr_prefix = int(sys.argv[4])
         subnet_name = sys.argv[5]
 
-        network_view_ref = get_network_view_ref(session, network_view_name)
-        if network_view_ref is None:
+        result = _reserve(session, network_view_name, supernet_cidr, cidr_prefix, subnet_name)
+        if result is None:
+            print("Error: No available CIDR found.")
             sys.exit(1)
+        available_cidr, ref, supernet_utilization = result
 
-        available_cidr = find_available_cidr(session, network_view_ref, supernet_cidr, cidr_prefix)
-        if available_cidr:
-            supernet_ref = "" # Placeholder, to avoid errors.
-            try:
-                response = session.get(f"/wapi/v2.11/network?network={supernet_cidr}&network_view={network_view_ref}", timeout=10)
-                response.raise_for_status()
-                supernet_data = response.json()
-                if supernet_data:
-                    supernet_ref = supernet_data[0]['_ref']
-            except requests.exceptions.RequestException as e:
-                print(f"Error retrieving supernet ref: {e}")
-
-            supernet_utilization = get_supernet_utilization(session, supernet_ref)
-
-            print(f"Found available CIDR: {available_cidr}")
-            print(f"Supernet CIDR: {supernet_cidr}")
-            print(f"Subnet Name: {subnet_name}")
-            if supernet_utilization is not None:
-                print(f"Supernet Utilization: {supernet_utilization:.2f}%")
-            else:
-                print("Supernet Utilization: N/A")
-            # Write the outputs to files for consumption by later GitHub Actions steps
-            with open("reserved_cidr.txt", "w") as f:
-                f.write(available_cidr)
-            with open("supernet_cidr.txt", "w") as f:
-                f.write(supernet_cidr)
-            with open("subnet_name.txt", "w") as f:
-                f.write(subnet_name)
-            if supernet_utilization is not None:
-                with open("supernet_utilization.txt", "w") as f:
-                    f.write(str(supernet_utilization))
-
-            ref = reserve_cidr(session, network_view_ref, supernet_cidr, available_cidr, subnet_name)
-            if ref:
-                print(f"Successfully reserved CIDR {available_cidr} in Infoblox.  Ref: {ref}")
-            else:
-                print(f"Failed to reserve CIDR {available_cidr} in Infoblox.")
-                sys.exit(1)
+        print(f"Successfully reserved CIDR {available_cidr} in Infoblox.  Ref: {ref}")
+        print(f"Supernet CIDR: {supernet_cidr}")
+        print(f"Subnet Name: {subnet_name}")
+        if supernet_utilization is not None:
+            print(f"Supernet Utilization: {supernet_utilization:.2f}%")
         else:
-            print("Error: No available CIDR found.")
-            sys.exit(1)
+            print("Supernet Utilization: N/A")
+        write_outputs({
+            "reserved_cidr.txt": available_cidr,
+            "supernet_cidr.txt": supernet_cidr,
+            "subnet_name.txt": subnet_name,
+            "supernet_utilization.txt": supernet_utilization,
+        })
 
     elif operation == "delete":
         if len(sys.argv) != 5:
@@ -284,17 +394,11 @@ def main():
         cidr_to_delete = sys.argv[3]
         subnet_name = sys.argv[4]
 
-        network_view_ref = get_network_view_ref(session, network_view_name)
-        if network_view_ref is None:
-            sys.exit(1)
-
-        if delete_cidr(session, network_view_ref, cidr_to_delete, subnet_name):
+        if _delete(session, network_view_name, cidr_to_delete, subnet_name):
             print(f"Successfully deleted CIDR {cidr_to_delete} from Infoblox.")
         else:
             print(f"Failed to delete CIDR {cidr_to_delete} from Infoblox.")
             sys.exit(1)
 
-    session.close()
-
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,25 +2,59 @@ import requests
 import os
 import argparse
 import urllib3
+from functools import cache
+from types import SimpleNamespace
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 urllib3.disable_warnings()
 
-INFOBLOX_URL = "https://infoblox.example.com/wapi/v2.10"
-USERNAME = os.getenv('INFOBLOX_USER')
-PASSWORD = os.getenv('INFOBLOX_PASS')
+DEFAULT_INFOBLOX_URL = "https://infoblox.example.com/wapi/v2.10"
+
+@cache
+def settings():
+    """Reads and validates the Infoblox connection settings once per process."""
+    username = os.getenv('INFOBLOX_USER')
+    password = os.getenv('INFOBLOX_PASS')
+    if not username or not password:
+        raise Exception("INFOBLOX_USER and INFOBLOX_PASS must be set in the environment")
+    return SimpleNamespace(
+        url=os.getenv('INFOBLOX_URL', DEFAULT_INFOBLOX_URL).rstrip('/'),
+        auth=(username, password),
+    )
+
+@cache
+def get_session():
+    """
+    Returns one keep-alive session for all WAPI calls, so the lookup and the
+    reservation/deletion that follows share a single TLS connection.
+    Retries only apply to reads (GET/HEAD): a replayed POST could reserve
+    twice, and a replayed DELETE that already succeeded would 404.
+    """
+    session = requests.Session()
+    session.auth = settings().auth
+    session.verify = False
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504],
+                          allowed_methods=frozenset({"GET", "HEAD"})),
+    ))
+    return session
 
 def reserve_ip(network_view, supernet, cidr, subnet_name):
-    url = f"{INFOBLOX_URL}/networkcontainer"
-    auth = (USERNAME, PASSWORD)
+    session = get_session()
+    base_url = settings().url
+    url = f"{base_url}/networkcontainer"
 
     # Verify Supernet Availability
-    params = {"network": supernet, "network_view": network_view}
-    response = requests.get(url, params=params, auth=auth, verify=False)
+    params = {"network": supernet, "network_view": network_view, "_return_fields": "", "_max_results": 1}
+    response = session.get(url, params=params)
     if response.status_code != 200 or not response.json():
         raise Exception(f"Supernet not found: {response.text}")
 
     # Reserve IP Network
-    reserve_url = f"{INFOBLOX_URL}/network"
+    reserve_url = f"{base_url}/network"
     payload = {
         "network_view": network_view,
         "network": f"func:nextavailablenetwork:{supernet},{cidr}",
@@ -28,7 +62,7 @@ def reserve_ip(network_view, supernet, cidr, subnet_name):
         "extattrs": {"SiteCode": {"value": "GCP"}}
     }
 
-    reservation_response = requests.post(reserve_url, json=payload, auth=auth, verify=False)
+    reservation_response = session.post(reserve_url, json=payload)
     if reservation_response.status_code != 201:
         raise Exception(f"Reservation failed: {reservation_response.text}")
 
@@ -36,16 +70,26 @@ def reserve_ip(network_view, supernet, cidr, subnet_name):
     print(f"✅ Reserved CIDR: {network_result['network']}")
 
 def delete_reservation(network_view, cidr, subnet_name):
-    url = f"{INFOBLOX_URL}/network"
-    auth = (USERNAME, PASSWORD)
+    session = get_session()
+    base_url = settings().url
+    url = f"{base_url}/network"
 
-    params = {"network_view": network_view, "network": cidr, "comment": subnet_name}
-    response = requests.get(url, params=params, auth=auth, verify=False)
-    if response.status_code != 200 or not response.json():
+    # Only the _ref is needed: an empty _return_fields returns nothing else,
+    # and a (view, network) pair matches at most one object.
+    params = {
+        "network_view": network_view,
+        "network": cidr,
+        "comment": subnet_name,
+        "_return_fields": "",
+        "_max_results": 1,
+    }
+    response = session.get(url, params=params)
+    matches = response.json() if response.status_code == 200 else None
+    if not matches:
         raise Exception(f"Reservation not found: {response.text}")
 
-    network_ref = response.json()[0]['_ref']
-    del_response = requests.delete(f"{INFOBLOX_URL}/{network_ref}", auth=auth, verify=False)
+    network_ref = matches[0]['_ref']
+    del_response = session.delete(f"{base_url}/{network_ref}")
 
     if del_response.status_code != 200:
         raise Exception(f"Deletion failed: {del_response.text}")
@@ -1,21 +1,17 @@
-# Save this as a new file, for example 'infoblox_delete_cidr.py'
 import argparse
 import requests
-import json
 import os
 import logging
 
+# Shared with infoblox_reserve_cidr.py, deployed alongside this script
+from infoblox_session import get_infoblox_session, REQUEST_TIMEOUT
+
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s]: %(message)s')
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format='%(asctime)s [%(levelname)s]: %(message)s')
+# urllib3's connection-pool chatter is noise even when LOG_LEVEL=DEBUG
+logging.getLogger("urllib3").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
-def get_infoblox_session(infoblox_url, username, password):
-    """Establishes a session with Infoblox and handles authentication."""
-    session = requests.Session()
-    session.auth = (username, password)
-    session.verify = False # For production, manage certificates properly.
-    return session
-
 def find_network(session, infoblox_url, network_view, subnet_cidr):
     """
     Finds a specific network CIDR and logs its details, including its _ref.
@@ -23,39 +19,39 @@ def find_network(session, infoblox_url, network_view, subnet_cidr):
     """
     base_wapi_url = infoblox_url.rstrip('/')
     get_ref_url = f"{base_wapi_url}/network"
-    logger.info(f"DRY-RUN: Searching for subnet '{subnet_cidr}' in view '{network_view}'...")
+    logger.info("DRY-RUN: Searching for subnet '%s' in view '%s'...", subnet_cidr, network_view)
     
     get_ref_params = {
         "network_view": network_view,
         "network": subnet_cidr,
         "_return_fields+": "comment,extattrs" # Get extra details for verification
     }
-    logger.info(f"DEBUG: Params for finding subnet: {json.dumps(get_ref_params)}")
+    logger.debug("DEBUG: Params for finding subnet: %s", get_ref_params)
     
     response = None
     try:
-        response = session.get(get_ref_url, params=get_ref_params, timeout=30)
+        response = session.get(get_ref_url, params=get_ref_params, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         if data and isinstance(data, list) and len(data) > 0 and '_ref' in data[0]:
             subnet_details = data[0]
             subnet_ref = subnet_details['_ref']
             logger.info("--- DRY-RUN: SUBNET FOUND ---")
-            logger.info(f"  CIDR:           {subnet_details.get('network')}")
-            logger.info(f"  Network View:   {subnet_details.get('network_view')}")
-            logger.info(f"  Comment:        {subnet_details.get('comment', 'N/A')}")
-            logger.info(f"  Ext. Attrs:     {subnet_details.get('extattrs', 'N/A')}")
-            logger.info(f"  Internal Ref:   {subnet_ref}")
+            logger.info("  CIDR:           %s", subnet_details.get('network'))
+            logger.info("  Network View:   %s", subnet_details.get('network_view'))
+            logger.info("  Comment:        %s", subnet_details.get('comment', 'N/A'))
+            logger.info("  Ext. Attrs:     %s", subnet_details.get('extattrs', 'N/A'))
+            logger.info("  Internal Ref:   %s", subnet_ref)
             logger.info("--- Review the details above before approving the 'apply' job. ---")
             return subnet_ref
         else:
-            logger.error(f"ERROR: Could not find subnet '{subnet_cidr}' in view '{network_view}'.")
-            logger.error(f"Infoblox Response: {json.dumps(data)}")
+            logger.error("ERROR: Could not find subnet '%s' in view '%s'.", subnet_cidr, network_view)
+            logger.error("Infoblox Response: %s", data)
             return None
     except requests.exceptions.RequestException as e:
-        logger.error(f"ERROR: Infoblox API request failed while finding subnet: {e}")
+        logger.error("ERROR: Infoblox API request failed while finding subnet: %s", e)
         if response is not None:
-             logger.error(f"Infoblox Response Content: {response.text}")
+             logger.error("Infoblox Response Content: %s", response.text)
         return None
 
 def delete_network(session, infoblox_url, subnet_ref):
@@ -66,20 +62,20 @@ def delete_network(session, infoblox_url, subnet_ref):
     base_wapi_url = infoblox_url.rstrip('/')
     delete_url = f"{base_wapi_url}/{subnet_ref}"
     
-    logger.info(f"APPLY: Sending DELETE request for object with reference: {subnet_ref}")
-    logger.info(f"  DELETE URL: {delete_url}")
+    logger.info("APPLY: Sending DELETE request for object with reference: %s", subnet_ref)
+    logger.info("  DELETE URL: %s", delete_url)
 
     response = None
     try:
-        response = session.delete(delete_url, timeout=30)
+        response = session.delete(delete_url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         deleted_ref = response.json()
-        logger.info(f"SUCCESS: Successfully deleted subnet. Infoblox returned ref: {deleted_ref}")
+        logger.info("SUCCESS: Successfully deleted subnet. Infoblox returned ref: %s", deleted_ref)
         return True
     except requests.exceptions.RequestException as e:
-        logger.error(f"ERROR: Infoblox API request failed during deletion: {e}")
+        logger.error("ERROR: Infoblox API request failed during deletion: %s", e)
         if response is not None:
-             logger.error(f"Infoblox Response Content: {response.text}")
+             logger.error("Infoblox Response Content: %s", response.text)
         return False
 
 def main():
@@ -91,12 +87,14 @@ def main():
     # Parser for the 'dry-run' action
     parser_dryrun = subparsers.add_parser('dry-run', help='Find a subnet to be deleted and show its details.')
     parser_dryrun.add_argument("--infoblox-url", required=True, help="Infoblox WAPI URL")
+    parser_dryrun.add_argument("--ca-bundle", help="CA bundle used to verify the Infoblox certificate (default: $INFOBLOX_CA_BUNDLE; verification is disabled if neither is set)")
     parser_dryrun.add_argument("--network-view", required=True, help="Infoblox Network View")
     parser_dryrun.add_argument("--subnet-cidr", required=True, help="The exact CIDR of the subnet to find")
 
     # Parser for the 'apply' action
     parser_apply = subparsers.add_parser('apply', help='Apply the deletion of a subnet using its reference.')
     parser_apply.add_argument("--infoblox-url", required=True, help="Infoblox WAPI URL")
+    parser_apply.add_argument("--ca-bundle", help="CA bundle used to verify the Infoblox certificate (default: $INFOBLOX_CA_BUNDLE; verification is disabled if neither is set)")
     parser_apply.add_argument("--subnet-ref", required=True, help="The internal _ref of the subnet to be deleted")
 
     args = parser.parse_args()
@@ -108,7 +106,7 @@ def main():
         logger.error("Infoblox username or password not found in environment variables.")
         exit(1)
         
-    session = get_infoblox_session(args.infoblox_url, infoblox_username, infoblox_password)
+    session = get_infoblox_session(args.infoblox_url, infoblox_username, infoblox_password, args.ca_bundle)
     if not session:
         logger.error("Failed to establish Infoblox session.")
         exit(1)
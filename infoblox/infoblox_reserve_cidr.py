@@ -1,101 +1,154 @@
 import argparse
-import requests
+import functools
 import json
-import ipaddress
+import re
 import os
 import logging
+import threading
+import time
+
+# Shared with infoblox_delete_cidr.py, deployed alongside this script
+from infoblox_session import get_infoblox_session, REQUEST_TIMEOUT
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s]: %(message)s')
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format='%(asctime)s [%(levelname)s]: %(message)s')
+# urllib3's connection-pool chatter is noise even when LOG_LEVEL=DEBUG
+logging.getLogger("urllib3").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
-def get_infoblox_session(infoblox_url, username, password):
-    """Establishes a session with Infoblox and handles authentication."""
-    session = requests.Session()
-    session.auth = (username, password)
-    session.verify = False # For production, set to True and manage certs
-    return session
+# An IPv4 supernet: "a.b.c.d" or "a.b.c.d/nn" with octets in 0-255 (no
+# leading zeros, which some parsers read as octal) and nn in 0-32.
+_OCTET = r"(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_SUPERNET_RE = re.compile(rf"{_OCTET}(\.{_OCTET}){{3}}(/(\d|[12]\d|3[0-2]))?")
+
+# Infoblox reports utilization in tenths of a percent, so 1000 means full.
+FULL_UTILIZATION = 1000
 
-def find_next_available_cidr(session, infoblox_url, network_view, supernet_ip, cidr_block_size):
+# Dry-run proposals are reused for identical (url, view, supernet, size)
+# lookups for a few seconds, so a batch or a retried step does not repeat them.
+PROPOSAL_CACHE_TTL_SECONDS = 5
+_PROPOSAL_CACHE = {}  # key -> (fetched_at, proposed_subnet)
+_PROPOSAL_LOCKS = {}  # key -> Lock, so concurrent identical lookups run once
+_PROPOSAL_LOCKS_GUARD = threading.Lock()
+
+def find_next_available_cidr(session, infoblox_url, network_view, supernet_ip, cidr_block_size, use_cache=True):
     """
-    Finds the next available CIDR block within the specified supernet and network view.
-    Uses network_container and _return_type="nextavailablenet".
+    Returns the next available CIDR for the supernet (see _find_next_available_cidr),
+    reusing a proposal fetched for the same inputs in the last
+    PROPOSAL_CACHE_TTL_SECONDS unless use_cache is False.
     """
-    wapi_url = f"{infoblox_url.rstrip('/')}/network"
+    if not use_cache:
+        return _find_next_available_cidr(session, infoblox_url, network_view, supernet_ip, cidr_block_size)
 
-    logger.info(f"DEBUG SCRIPT: Inside find_next_available_cidr:")
-    logger.info(f"DEBUG SCRIPT:   infoblox_url (raw) = '{infoblox_url}'")
-    logger.info(f"DEBUG SCRIPT:   constructed wapi_url = '{wapi_url}'")
-    logger.info(f"DEBUG SCRIPT:   network_view = '{network_view}'")
-    logger.info(f"DEBUG SCRIPT:   supernet_ip (as network_container) = '{supernet_ip}'")
-    logger.info(f"DEBUG SCRIPT:   cidr_block_size (for new subnet) = '{cidr_block_size}'")
+    key = (infoblox_url, network_view, supernet_ip, int(cidr_block_size))
+    with _PROPOSAL_LOCKS_GUARD:
+        lock = _PROPOSAL_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        cached = _PROPOSAL_CACHE.get(key)
+        if cached and time.monotonic() - cached[0] < PROPOSAL_CACHE_TTL_SECONDS:
+            logger.debug("Reusing cached proposal %s for %s", cached[1], key)
+            return cached[1]
+        proposed_subnet = _find_next_available_cidr(session, infoblox_url, network_view, supernet_ip, cidr_block_size)
+        if proposed_subnet:
+            _PROPOSAL_CACHE[key] = (time.monotonic(), proposed_subnet)
+        return proposed_subnet
+
+def _find_next_available_cidr(session, infoblox_url, network_view, supernet_ip, cidr_block_size):
+    """
+    Finds the next available CIDR block using a two-step process:
+    1. GET the _ref for the supernet (as a networkcontainer).
+    2. POST to the supernet's _ref to call _function=next_available_network.
+    """
+    import requests
 
-    params = {
+    base_wapi_url = infoblox_url.rstrip('/')
+    
+    get_ref_url = f"{base_wapi_url}/networkcontainer"
+    logger.debug("DEBUG SCRIPT: Step 1 - Getting _ref for supernet '%s' (as a networkcontainer) in view '%s'", supernet_ip, network_view)
+    
+    get_ref_params = {
         "network_view": network_view,
-        "network_container": supernet_ip, # Use supernet_ip as the container/parent
-        "cidr": cidr_block_size,          # The desired prefix of the new network
-        "_return_type": "nextavailablenet", # Ask for the next available network(s)
-        "_return_fields+": "network",     # We want the network CIDR string primarily
-        "num": 1                          # We need one such network
+        "network": supernet_ip,
+        "_return_fields": ""  # Only the _ref is needed; an empty list returns nothing else
     }
-    logger.info(f"DEBUG SCRIPT: Params dictionary for next available network: {json.dumps(params, indent=2)}")
-
-    logger.info(f"Attempting to find next available /{cidr_block_size} in View: {network_view} from Container: {supernet_ip}...")
+    logger.debug("DEBUG SCRIPT: Params for getting ref: %s", get_ref_params)
+    
     response = None
+    supernet_ref = None
     try:
-        response = session.get(wapi_url, params=params, timeout=30)
+        response = session.get(get_ref_url, params=get_ref_params, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()
+        if data and isinstance(data, list) and len(data) > 0 and '_ref' in data[0]:
+            supernet_ref = data[0]['_ref']
+            logger.debug("DEBUG SCRIPT: Found supernet _ref: %s", supernet_ref)
+        else:
+            logger.error("ERROR: Could not find _ref for supernet '%s' when searching for a 'networkcontainer'.", supernet_ip)
+            logger.error("Infoblox Response: %s", data)
+            logger.error("VERIFICATION: Please ensure the supernet exists and is configured as a 'Network Container' in Infoblox.")
+            return None
+    except requests.exceptions.RequestException as e:
+        logger.error("ERROR: Infoblox API request failed during Step 1 (getting _ref): %s", e)
+        if response is not None:
+             logger.error("Infoblox Response Content: %s", response.text)
+        return None
 
-        # For _return_type=nextavailablenet, Infoblox typically returns a list of CIDR strings
-        if data and isinstance(data, list) and len(data) > 0:
-            if isinstance(data[0], str): # Expected: List of CIDR strings
-                proposed_network = data[0]
-                logger.info(f"SUCCESS: Proposed network CIDR string found: {proposed_network}")
-                return proposed_network
-            # Less common for _return_type=nextavailablenet, but handle if it returns objects
-            elif isinstance(data[0], dict) and 'network' in data[0]:
-                 proposed_network = data[0]['network']
-                 logger.info(f"SUCCESS: Proposed network object found, CIDR: {proposed_network}")
-                 return proposed_network
-            else:
-                logger.error(f"ERROR: Unexpected item type in list from Infoblox: {type(data[0])}")
-                logger.error(f"Raw Infoblox Response: {json.dumps(data, indent=2)}")
-                return None
+    if not supernet_ref:
+        return None
+
+    post_func_url = f"{base_wapi_url}/{supernet_ref}"
+    
+    post_func_params = {
+        "_function": "next_available_network"
+    }
+    
+    post_func_payload = {
+        "num": 1,
+        "cidr": cidr_block_size
+    }
+    
+    logger.debug("DEBUG SCRIPT: Step 2 - Calling 'next_available_network' function on _ref '%s'", supernet_ref)
+    logger.debug("DEBUG SCRIPT:   Payload for POST: %s", post_func_payload)
+
+    response = None
+    try:
+        response = session.post(post_func_url, params=post_func_params, json=post_func_payload, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        
+        if data and isinstance(data, dict) and 'networks' in data and len(data['networks']) > 0:
+            proposed_network = data['networks'][0]
+            logger.info("SUCCESS: Proposed network CIDR string found: %s", proposed_network)
+            return proposed_network
         else:
-            logger.error(f"ERROR: No available network found or empty list in response from Infoblox.")
-            logger.error(f"Raw Infoblox Response: {json.dumps(data, indent=2) if data else 'No data in response'}")
+            logger.error("ERROR: Could not find 'networks' in response from next_available_network function call.")
+            logger.error("Raw Infoblox Response: %s", data)
             return None
-            
+
     except requests.exceptions.HTTPError as http_err:
-        logger.error(f"ERROR: Infoblox API request failed (HTTPError): {http_err}")
+        logger.error("ERROR: Infoblox API request failed during Step 2 (calling function): %s", http_err)
         if http_err.response is not None:
-            logger.error(f"Infoblox Response Content: {http_err.response.text}") # This will show the exact error from Infoblox
+            logger.error("Infoblox Response Content: %s", http_err.response.text)
         return None
     except requests.exceptions.RequestException as e:
-        logger.error(f"ERROR: Infoblox API request failed (RequestException): {e}")
+        logger.error("ERROR: Infoblox API request failed (RequestException) during Step 2: %s", e)
         if response is not None:
-            logger.error(f"Infoblox Response Text (if available): {response.text}")
+            logger.error("Infoblox Response Text (if available): %s", response.text)
         return None
     except json.JSONDecodeError:
-        logger.error(f"ERROR: Failed to parse JSON response from Infoblox.")
+        logger.error("ERROR: Failed to parse JSON response from Infoblox during Step 2.")
         if response is not None:
-             logger.error(f"Infoblox Raw Response: {response.text}")
+             logger.error("Infoblox Raw Response: %s", response.text)
         return None
 
+
 def reserve_cidr(session, infoblox_url, proposed_subnet, network_view, subnet_name, site_code):
     """
     Performs the actual CIDR reservation (network creation) in Infoblox.
     """
-    wapi_url = f"{infoblox_url.rstrip('/')}/network"
+    import requests
 
-    logger.info(f"DEBUG SCRIPT: Inside reserve_cidr:")
-    logger.info(f"DEBUG SCRIPT:   infoblox_url (raw) = '{infoblox_url}'")
-    logger.info(f"DEBUG SCRIPT:   constructed wapi_url = '{wapi_url}'")
-    logger.info(f"DEBUG SCRIPT:   proposed_subnet = '{proposed_subnet}'")
-    logger.info(f"DEBUG SCRIPT:   network_view = '{network_view}'")
-    logger.info(f"DEBUG SCRIPT:   subnet_name (comment) = '{subnet_name}'")
-    logger.info(f"DEBUG SCRIPT:   site_code = '{site_code}'")
+    wapi_url = f"{infoblox_url.rstrip('/')}/network"
 
     payload = {
         "network": proposed_subnet,
@@ -105,36 +158,78 @@ def reserve_cidr(session, infoblox_url, proposed_subnet, network_view, subnet_na
             "Site Code": {"value": site_code}
         }
     }
-    logger.info(f"DEBUG SCRIPT: Payload for CIDR reservation: {json.dumps(payload, indent=2)}")
-
-    logger.info(f"Attempting to reserve CIDR: {proposed_subnet} in network view: {network_view}...")
+    logger.info("Attempting to reserve CIDR: %s in network view: %s...", proposed_subnet, network_view)
     response = None
     try:
-        response = session.post(wapi_url, json=payload, timeout=30)
+        response = session.post(wapi_url, json=payload, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()
-        logger.info(f"SUCCESS: Successfully reserved CIDR: {proposed_subnet}. Infoblox Ref: {data}")
+        logger.info("SUCCESS: Successfully reserved CIDR: %s. Infoblox Ref: %s", proposed_subnet, data)
         return True
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"ERROR: Infoblox API request failed (HTTPError) during CIDR reservation: {http_err}")
-        if http_err.response is not None:
-            logger.error(f"Infoblox Response Content: {http_err.response.text}")
-        return False
     except requests.exceptions.RequestException as e:
-        logger.error(f"ERROR: Infoblox API request failed (RequestException) during CIDR reservation: {e}")
+        logger.error("ERROR: Infoblox API request failed during CIDR reservation: %s", e)
         if response is not None:
-            logger.error(f"Infoblox Response Text (if available): {response.text}")
+             logger.error("Infoblox Response Content: %s", response.text)
         return False
+
+def reserve_cidr_atomic(session, infoblox_url, supernet_ip, network_view, cidr_block_size, subnet_name, site_code):
+    """
+    Allocates and creates the next available network in one POST, using the
+    WAPI 'func:nextavailablenetwork' syntax. Returns the reserved CIDR, or None.
+    Unlike find_next_available_cidr + reserve_cidr, nothing can claim the CIDR
+    between the lookup and the reservation.
+    """
+    import requests
+
+    wapi_url = f"{infoblox_url.rstrip('/')}/network"
+
+    payload = {
+        "network": f"func:nextavailablenetwork:{supernet_ip},{network_view},{cidr_block_size}",
+        "network_view": network_view,
+        "comment": subnet_name,
+        "extattrs": {
+            "Site Code": {"value": site_code}
+        }
+    }
+    logger.info("Attempting to reserve the next available /%s in %s (view: %s)...", cidr_block_size, supernet_ip, network_view)
+    response = None
+    try:
+        response = session.post(wapi_url, params={"_return_fields": "network"}, json=payload, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        reserved = data.get("network") if isinstance(data, dict) else None
+        if not reserved:
+            logger.error("ERROR: Unexpected response from atomic CIDR reservation: %s", data)
+            return None
+        logger.info("SUCCESS: Successfully reserved CIDR: %s. Infoblox Ref: %s", reserved, data.get("_ref"))
+        # Any cached proposal for this supernet is now stale
+        for key in list(_PROPOSAL_CACHE):
+            if key[1:3] == (network_view, supernet_ip):
+                _PROPOSAL_CACHE.pop(key, None)
+        return reserved
+    except requests.exceptions.RequestException as e:
+        logger.error("ERROR: Infoblox API request failed during atomic CIDR reservation: %s", e)
+        if response is not None:
+             logger.error("Infoblox Response Content: %s", response.text)
+        return None
     except json.JSONDecodeError:
-        logger.error(f"ERROR: Failed to parse JSON response from Infoblox during CIDR reservation.")
+        logger.error("ERROR: Failed to parse JSON response from Infoblox during atomic CIDR reservation.")
         if response is not None:
-            logger.error(f"Infoblox Raw Response: {response.text}")
-        return False
+             logger.error("Infoblox Raw Response: %s", response.text)
+        return None
 
 def get_supernet_info(session, infoblox_url, supernet_ip, network_view):
-    logger.info(f"DEBUG SCRIPT: Simulating supernet info for {supernet_ip} in view {network_view}.")
+    logger.debug("DEBUG SCRIPT: Simulating supernet info for %s in view %s.", supernet_ip, network_view)
     return f"Information for supernet {supernet_ip} in network view {network_view} (simulation)"
 
+
+def _valid_supernet(supernet_ip):
+    """
+    Checks an IPv4 supernet with a single regex, without building an
+    ipaddress network object.
+    """
+    return _SUPERNET_RE.fullmatch(str(supernet_ip)) is not None
+
 def validate_inputs(network_view, supernet_ip, subnet_name, cidr_block_size_str):
     if not all([network_view, supernet_ip, subnet_name, str(cidr_block_size_str)]):
         logger.error("Validation Error: All inputs (network_view, supernet_ip, subnet_name, cidr_block_size) are required.")
@@ -142,34 +237,151 @@ def validate_inputs(network_view, supernet_ip, subnet_name, cidr_block_size_str)
     try:
         cidr_block_size = int(cidr_block_size_str)
         if not (1 <= cidr_block_size <= 32):
-            logger.error(f"Validation Error: CIDR block size must be an integer between 1 and 32. Received: {cidr_block_size}")
+            logger.error("Validation Error: CIDR block size must be an integer between 1 and 32. Received: %s", cidr_block_size)
             return False
     except ValueError:
-        logger.error(f"Validation Error: CIDR block size must be a valid integer. Received: {cidr_block_size_str}")
+        logger.error("Validation Error: CIDR block size must be a valid integer. Received: %s", cidr_block_size_str)
         return False
-    try:
-        ipaddress.ip_network(supernet_ip, strict=False)
-    except ValueError:
-        logger.error(f"Validation Error: Invalid Supernet IP format: {supernet_ip}")
+    if not _valid_supernet(supernet_ip):
+        logger.error("Validation Error: Invalid Supernet IP format: %s", supernet_ip)
         return False
     if not subnet_name.strip():
         logger.error("Validation Error: Subnet name cannot be empty or just whitespace.")
         return False
     return True
 
+def get_supernet_utilization(session, infoblox_url, network_view, supernet_ip):
+    """
+    Returns the supernet's (network container's) utilization in tenths of a
+    percent, or None if it could not be determined.
+    """
+    import requests
+
+    try:
+        response = session.get(
+            f"{infoblox_url.rstrip('/')}/networkcontainer",
+            params={"network_view": network_view, "network": supernet_ip, "_return_fields": "utilization"},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        data = response.json()
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        logger.warning("Could not read utilization for supernet %s: %s", supernet_ip, e)
+        return None
+    if data and isinstance(data, list):
+        return data[0].get("utilization")
+    return None
+
+def load_batch(batch_file):
+    """
+    Reads a batch file: a JSON list of objects with 'subnet_name', 'supernet_ip'
+    and 'cidr_block_size', plus optional 'network_view' and 'site_code' that
+    override the command-line values for that item. Raises ValueError if an
+    item's fields have the wrong JSON types.
+    """
+    with open(batch_file, "r") as f:
+        items = json.load(f)
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError("Batch file must contain a JSON list of objects.")
+    for index, item in enumerate(items):
+        for field in ("subnet_name", "supernet_ip"):
+            if not isinstance(item.get(field), str):
+                raise ValueError(f"Validation Error: item {index}: '{field}' must be a string.")
+        for field in ("network_view", "site_code"):
+            if field in item and not isinstance(item[field], str):
+                raise ValueError(f"Validation Error: item {index}: '{field}' must be a string.")
+        # bool is a subclass of int, but true/false is never a block size
+        if not isinstance(item.get("cidr_block_size"), int) or isinstance(item["cidr_block_size"], bool):
+            raise ValueError(f"Validation Error: item {index}: 'cidr_block_size' must be an integer.")
+    return items
+
+def run_batch(session, args, items):
+    """
+    Runs the dry-run lookup or the atomic reservation for every batch item
+    concurrently over the shared session. Returns a list of
+    {"subnet_name": ..., "cidr": ...} in input order; cidr is None on failure.
+    Dry-run results also carry "shared", True when the proposal overlaps
+    another item's in the same batch.
+
+    A supernet's utilization is only read after an item on it fails, at most
+    once per run; once it reads as full, the remaining items on it are failed
+    without a lookup or reservation call.
+    """
+    def supernet_key(item):
+        return item.get("network_view", args.network_view), item["supernet_ip"]
+
+    # Per-run cache: reservations only raise utilization, so a supernet read
+    # as full stays full for the rest of the run and needs no invalidation.
+    @functools.lru_cache(maxsize=64)
+    def utilization(key):
+        return get_supernet_utilization(session, args.infoblox_url, *key)
+
+    full_supernets = set()
+
+    def process(item):
+        network_view = item.get("network_view", args.network_view)
+        if supernet_key(item) in full_supernets:
+            logger.error("Supernet %s in view %s is full; skipping %s.", item["supernet_ip"], network_view, item["subnet_name"])
+            return None
+        if args.action == "dry-run":
+            cidr = find_next_available_cidr(
+                session, args.infoblox_url, network_view, item["supernet_ip"], item["cidr_block_size"],
+                use_cache=not args.no_cache
+            )
+        else:
+            cidr = reserve_cidr_atomic(
+                session, args.infoblox_url, item["supernet_ip"], network_view,
+                item["cidr_block_size"], item["subnet_name"], item.get("site_code", args.site_code)
+            )
+        if cidr is None:
+            used = utilization(supernet_key(item))
+            if used is not None and used >= FULL_UTILIZATION:
+                logger.error("Supernet %s in view %s is full.", item["supernet_ip"], network_view)
+                full_supernets.add(supernet_key(item))
+        return cidr
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(16, len(items))) as pool:
+        cidrs = list(pool.map(process, items))
+    results = [{"subnet_name": item["subnet_name"], "cidr": cidr} for item, cidr in zip(items, cidrs)]
+    if args.action == "dry-run":
+        # Lookups on the same supernet all see the same free space, while apply
+        # allocates each item its own; flag proposals that overlap another's.
+        import ipaddress
+
+        networks = [ipaddress.ip_network(cidr, strict=False) if cidr else None for cidr in cidrs]
+        for i, result in enumerate(results):
+            result["shared"] = networks[i] is not None and any(
+                j != i and other is not None and networks[i].overlaps(other) for j, other in enumerate(networks)
+            )
+    return results
+
 def main():
     parser = argparse.ArgumentParser(description="Infoblox CIDR Reservation Workflow Script")
     parser.add_argument("action", choices=["dry-run", "apply"], help="Action to perform: dry-run or apply")
     parser.add_argument("--infoblox-url", required=True, help="Infoblox WAPI URL (e.g., https://infoblox.example.com/wapi/vX.X)")
     parser.add_argument("--network-view", required=True, help="Infoblox Network View/Container")
-    parser.add_argument("--supernet-ip", required=True, help="Supernet IP from which to reserve (used as network_container)")
-    parser.add_argument("--subnet-name", required=True, help="Name for the new subnet (used as comment)")
-    parser.add_argument("--cidr-block-size", type=int, required=True, help="CIDR block size (e.g., 26 for /26)")
+    parser.add_argument("--supernet-ip", help="Supernet IP from which to reserve")
+    parser.add_argument("--subnet-name", help="Name for the new subnet (used as comment)")
+    parser.add_argument("--cidr-block-size", type=int, help="CIDR block size (e.g., 26 for /26)")
     parser.add_argument("--site-code", required=False, default="GCP", help="Site Code (default: GCP)")
-    parser.add_argument("--proposed-subnet", help="Proposed subnet from dry-run (for apply action)")
+    parser.add_argument("--proposed-subnet", help="Proposed subnet from dry-run (required for apply unless --atomic is given)")
+    parser.add_argument("--atomic", action="store_true", help="Apply without a dry-run proposal: allocate and reserve the next available subnet in one call")
+    parser.add_argument("--batch-file", help="JSON list of requests to process concurrently in one run (replaces --supernet-ip/--subnet-name/--cidr-block-size)")
+    parser.add_argument("--ca-bundle", help="CA bundle used to verify the Infoblox certificate (default: $INFOBLOX_CA_BUNDLE; verification is disabled if neither is set)")
+    parser.add_argument("--no-cache", action="store_true", help="Always query Infoblox for dry-run proposals instead of reusing recent identical lookups")
+    parser.add_argument("--verbose", action="store_true", help="Log request parameters and other debug details")
     parser.add_argument("--supernet-after-reservation", help="Supernet status after reservation (from dry-run, simulated)")
 
     args = parser.parse_args()
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    if not args.batch_file and not (args.supernet_ip and args.subnet_name and args.cidr_block_size):
+        parser.error("--supernet-ip, --subnet-name and --cidr-block-size are required unless --batch-file is given")
+    if args.batch_file and args.action == "apply" and not args.atomic:
+        # Batch apply has no per-item dry-run proposal, so it always allocates atomically
+        parser.error("batch apply reserves the next available subnets atomically; pass --atomic to confirm")
 
     infoblox_username = os.environ.get("INFOBLOX_USERNAME")
     infoblox_password = os.environ.get("INFOBLOX_PASSWORD")
@@ -178,31 +390,74 @@ def main():
         logger.error("Infoblox username or password not found in environment variables.")
         exit(1)
 
-    if not validate_inputs(args.network_view, args.supernet_ip, args.subnet_name, args.cidr_block_size):
+    if args.batch_file:
+        try:
+            batch = load_batch(args.batch_file)
+        except (OSError, ValueError) as e:
+            logger.error("Could not read batch file %s: %s", args.batch_file, e)
+            exit(1)
+        if not batch:
+            logger.error("Batch file %s contains no requests.", args.batch_file)
+            exit(1)
+        for item in batch:
+            if not validate_inputs(item.get("network_view", args.network_view), item.get("supernet_ip"),
+                                   item.get("subnet_name", ""), item.get("cidr_block_size")):
+                exit(1)
+    elif not validate_inputs(args.network_view, args.supernet_ip, args.subnet_name, args.cidr_block_size):
         exit(1)
-
-    session = get_infoblox_session(args.infoblox_url, infoblox_username, infoblox_password)
+        
+    session = get_infoblox_session(args.infoblox_url, infoblox_username, infoblox_password, args.ca_bundle)
     if not session:
         logger.error("Failed to establish Infoblox session.")
         exit(1)
 
+    if args.batch_file:
+        logger.info("\n--- Performing Batch %s (%s requests) ---", args.action, len(batch))
+        if args.action == "dry-run":
+            logger.info("Batch proposals are non-binding: apply --atomic allocates each item's subnet itself.")
+        results = run_batch(session, args, batch)
+        for result in results:
+            if result.get("shared"):
+                logger.warning("BATCH DRY-RUN: %s -> %s (overlaps another proposal in this batch; apply will allocate a different subnet)",
+                               result["subnet_name"], result["cidr"])
+            elif result["cidr"]:
+                logger.info("BATCH %s: %s -> %s", args.action.upper(), result["subnet_name"], result["cidr"])
+            else:
+                logger.error("BATCH %s FAILED: %s", args.action.upper(), result["subnet_name"])
+        if 'GITHUB_OUTPUT' in os.environ:
+            with open(os.environ['GITHUB_OUTPUT'], 'a') as f:
+                print(f"batch_results={json.dumps(results)}", file=f)
+        if not all(result["cidr"] for result in results):
+            exit(1)
+        logger.info("\nBatch %s completed successfully.", args.action)
+        return
+
     if args.action == "dry-run":
         logger.info("\n--- Performing Dry Run ---")
-        logger.info(f"DEBUG SCRIPT: Dry-run inputs - Network View: {args.network_view}, Supernet IP (Container): {args.supernet_ip}, Subnet Name: {args.subnet_name}, CIDR Size: {args.cidr_block_size}")
-        
         proposed_subnet = find_next_available_cidr(
-            session, args.infoblox_url, args.network_view, args.supernet_ip, args.cidr_block_size
+            session, args.infoblox_url, args.network_view, args.supernet_ip, args.cidr_block_size,
+            use_cache=not args.no_cache
         )
 
         if proposed_subnet:
-            logger.info(f"DRY RUN: Proposed Subnet to Reserve: {proposed_subnet}")
-            # ... (other dry run log messages) ...
+            logger.info("DRY RUN: Proposed Subnet to Reserve: %s", proposed_subnet)
             supernet_after_reservation = get_supernet_info(
                 session, args.infoblox_url, args.supernet_ip, args.network_view
             )
-            logger.info(f"DRY RUN: Supernet Status (simulated): {supernet_after_reservation}")
-            print(f"::set-output name=proposed_subnet::{proposed_subnet}")
-            print(f"::set-output name=supernet_after_reservation::{supernet_after_reservation}")
+            logger.info("DRY RUN: Supernet Status (simulated): %s", supernet_after_reservation)
+
+            # --- V V V THIS BLOCK IS THE ONLY CHANGE IN THIS SCRIPT V V V ---
+            # Use the modern GITHUB_OUTPUT method to set job outputs
+            if 'GITHUB_OUTPUT' in os.environ:
+                logger.info("Setting outputs using GITHUB_OUTPUT.")
+                with open(os.environ['GITHUB_OUTPUT'], 'a') as f:
+                    f.write(f"proposed_subnet={proposed_subnet}\nsupernet_after_reservation={supernet_after_reservation}\n")
+            else: # Fallback for older runners or local testing
+                logger.warning("GITHUB_OUTPUT not found. Falling back to deprecated ::set-output.")
+                print(f"::set-output name=proposed_subnet::{proposed_subnet}")
+                print(f"::set-output name=supernet_after_reservation::{supernet_after_reservation}")
+            # --- END OF CHANGE ---
+
             logger.info("\nDry run completed successfully.")
         else:
             logger.error("DRY RUN FAILED: Could not determine a proposed subnet.")
@@ -210,21 +465,35 @@ def main():
 
     elif args.action == "apply":
         logger.info("\n--- Performing Apply ---")
+        if args.atomic:
+            if args.proposed_subnet:
+                logger.error("Apply FAILED: --atomic and --proposed-subnet are mutually exclusive.")
+                exit(1)
+            # Explicitly requested: allocate and reserve in one atomic call
+            reserved = reserve_cidr_atomic(
+                session, args.infoblox_url, args.supernet_ip, args.network_view,
+                args.cidr_block_size, args.subnet_name, args.site_code
+            )
+            if not reserved:
+                logger.error("APPLY FAILED: Could not reserve a /%s from %s.", args.cidr_block_size, args.supernet_ip)
+                exit(1)
+            logger.info("APPLY: Successfully reserved CIDR: %s", reserved)
+            logger.info("\nApply completed successfully.")
+            return
+
         if not args.proposed_subnet:
             logger.error("Apply FAILED: Missing --proposed-subnet from dry run.")
             exit(1)
-        
-        logger.info(f"DEBUG SCRIPT: Apply inputs - Proposed Subnet: {args.proposed_subnet}, Network View: {args.network_view}, Subnet Name: {args.subnet_name}")
-        # ... (other apply log messages) ...
+
         success = reserve_cidr(
             session, args.infoblox_url, args.proposed_subnet, args.network_view, args.subnet_name, args.site_code
         )
         if success:
-            logger.info(f"APPLY: Successfully reserved CIDR: {args.proposed_subnet}")
+            logger.info("APPLY: Successfully reserved CIDR: %s", args.proposed_subnet)
             logger.info("\nApply completed successfully.")
         else:
-            logger.error(f"APPLY FAILED: Could not reserve CIDR: {args.proposed_subnet}.")
+            logger.error("APPLY FAILED: Could not reserve CIDR: %s.", args.proposed_subnet)
             exit(1)
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Shared Infoblox WAPI session setup for the reserve and delete CLIs in this
+directory: pooled keep-alive connections, read-only retries, optional CA
+verification and ibapauth cookie reuse.
+"""
+import os
+
+# Connection pool size and per-request timeout, tunable per runner
+POOL_CONNECTIONS = int(os.environ.get("INFOBLOX_POOL_CONNECTIONS", 16))
+POOL_MAXSIZE = int(os.environ.get("INFOBLOX_POOL_MAXSIZE", 16))
+REQUEST_TIMEOUT = float(os.environ.get("INFOBLOX_HTTP_TIMEOUT", 30))
+
+def get_infoblox_session(infoblox_url, username, password, ca_bundle=None):
+    """
+    Establishes a session with Infoblox and handles authentication.
+    TLS is verified against `ca_bundle` (or $INFOBLOX_CA_BUNDLE) when given;
+    otherwise verification stays disabled, as before.
+    """
+    # The HTTP stack is imported here rather than at module level, so --help
+    # and argument/validation errors exit without loading it.
+    import ssl
+    import requests
+    import urllib3
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class _SSLContextAdapter(HTTPAdapter):
+        """HTTPAdapter whose pooled connections all share one prebuilt SSLContext."""
+        def __init__(self, ssl_context, **kwargs):
+            self._ssl_context = ssl_context
+            super().__init__(**kwargs)
+
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs["ssl_context"] = self._ssl_context
+            return super().init_poolmanager(*args, **kwargs)
+
+    session = requests.Session()
+    session.auth = (username, password)
+    session.headers.update({"Accept": "application/json"})
+    # One keep-alive pool shared by every WAPI call, so connections (and their
+    # TLS handshakes) are reused. Retry transient gateway errors on reads only:
+    # a replayed reservation POST could reserve twice, and a replayed DELETE
+    # whose first attempt succeeded would fail with 404.
+    adapter_kwargs = dict(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504],
+                          allowed_methods=frozenset({"GET", "HEAD"})),
+    )
+    ca_bundle = ca_bundle or os.environ.get("INFOBLOX_CA_BUNDLE")
+    if ca_bundle:
+        # Load the CA bundle once into a context shared by every connection.
+        # verify=True (not the bundle path) keeps requests from passing
+        # ca_certs, which would make urllib3 reload it per connection.
+        session.verify = True
+        adapter = _SSLContextAdapter(ssl.create_default_context(cafile=ca_bundle), **adapter_kwargs)
+    else:
+        session.verify = False # For production, pass --ca-bundle / set INFOBLOX_CA_BUNDLE
+        # Silence the per-request InsecureRequestWarning once, not on every call
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        adapter = HTTPAdapter(**adapter_kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks["response"].append(_adopt_ibapauth_cookie(session))
+    return session
+
+def _adopt_ibapauth_cookie(session):
+    """
+    Returns a response hook that switches the session from HTTP Basic to the
+    WAPI 'ibapauth' cookie as soon as a real response carries it, so later
+    requests skip server-side credential verification without an extra call.
+    """
+    def hook(response, *args, **kwargs):
+        if session.auth is not None and "ibapauth" in response.cookies:
+            # The hook runs before requests stores the response cookies, so
+            # copy the cookie in now rather than leave a request with neither
+            session.cookies.update(response.cookies)
+            session.auth = None
+        return response
+    return hook